@@ -3,49 +3,84 @@
 Costco Precious Metals → Bluesky + X Alert (CI-safe)
 
 Flow:
-  1) Launch Playwright and open the Precious Metals page.
+  0) Query the search JSON API directly (API_FIRST). If it answers, decide from it
+     and only launch the browser when a post needs its screenshot.
+  1) Otherwise launch Playwright and open the Precious Metals page.
   2) Capture JSON via network hook (fast path).
-  3) If not captured, mine the HAR (works on CI even if live API 401s).
-  4) If still missing, scrape DOM tiles.
+  3) If not captured, scrape DOM tiles.
+  4) If still missing, close the context (flushing the HAR) and mine the HAR
+     (works on CI even if live API 401s) before falling back to text heuristics.
   5) Build a summary and post:
      - Always to Bluesky.
      - To X only when allowed (state-change gate + cooldown + monthly cap).
 
+Usage:
+  python costcopm_alert.py [--once]          (single check; what CI runs)
+  python costcopm_alert.py --daemon          (poll every POLL_INTERVAL_SECONDS, one browser for all polls)
+
 Env:
   CI=true/false
   BROWSER=webkit|firefox|chrome|chromium     (defaults: webkit on CI, firefox locally)
   HEADLESS=true|false                        (default: true)
+  BROWSER_WS_ENDPOINT=ws://host:port/        (connect to `playwright run-server`; BROWSER picks the engine)
+  BROWSER_PROFILE_DIR=.pw-profile            (opt-in persistent profile: reuse HTTP cache/cookies across runs;
+                                              skips the request filter, since routing disables the cache,
+                                              and relaunches the browser per check, so not for --daemon)
   POST_STATUS_UPDATES=true|false             (post even when OOS)
   ALWAYS_POST_WHEN_INCONCLUSIVE=true|false   (post even when signal is inconclusive)
+  LOG_LEVEL=DEBUG|INFO|WARNING               (this script only; unknown values fall back to INFO)
+  DEBUG_ARTIFACTS=true|false                 (write api-sample.json, costco.jpg etc. for inspection; default: false)
+  API_FIRST=true|false                       (try the search API before the browser; default: true)
+  POLL_INTERVAL_SECONDS=300                  (--daemon cadence)
+  RECORD_HAR=true|false                      (record run.har for the HAR-mining fallback; default: CI)
+  CAPTURE_SCREENSHOT=true|false              (attach a screenshot; false also blocks images; default: true)
   BSKY_HANDLE=you.bsky.social
   BSKY_APP_PASSWORD=xxxx-xxxx-xxxx-xxxx
+  BSKY_SESSION_PATH=.bsky_session            (saved login session, reused across local/daemon runs; not kept on CI)
 
   # X (Twitter)
   POST_TO_X=true|false
   MAX_X_POSTS_PER_MONTH=450
   MIN_SECONDS_BETWEEN_X_POSTS=1800
+  MIN_SECONDS_BETWEEN_STATUS_POSTS=21600     (same-state OOS/inconclusive repost interval)
   TW_CONSUMER_KEY=...
   TW_CONSUMER_SECRET=...
   TW_ACCESS_TOKEN=...
   TW_ACCESS_TOKEN_SECRET=...
 """
 
+import io
 import os
+import argparse
 import re
 import sys
 import json
 import time
-import builtins
+import functools
+import atexit
+import logging
+import threading
 from pathlib import Path
-from datetime import datetime
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from time import sleep
 from random import uniform
 
+import requests
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
-from atproto import Client, models
-import tweepy
+
+try:
+    import orjson  # optional: much faster on large search payloads / HARs
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import ijson  # optional: stream HAR entries instead of loading the whole file
+except ImportError:
+    ijson = None
 
 
 # ------------------------------------------------------------------------------
@@ -53,20 +88,50 @@ import tweepy
 # ------------------------------------------------------------------------------
 load_dotenv()
 
+# Lazy %-style formatting: messages below the level are never built.
+# Only our logger is configured, so library loggers (httpx under atproto) stay at WARNING.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+if LOG_LEVEL not in {"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"}:
+    LOG_LEVEL = "INFO"
+log = logging.getLogger("costcopm")
+# Progress to stdout, warnings/errors to stderr (where the old print(..., file=sys.stderr) went)
+_log_out = logging.StreamHandler(sys.stdout)
+_log_out.addFilter(lambda record: record.levelno < logging.WARNING)
+_log_err = logging.StreamHandler(sys.stderr)
+_log_err.setLevel(logging.WARNING)
+for _h in (_log_out, _log_err):
+    _h.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_h)
+log.setLevel(LOG_LEVEL)
+log.propagate = False
+
 IS_CI = str(os.getenv("CI", "")).lower() in {"1", "true", "yes", "on"}
 USE_BROWSER = os.getenv("BROWSER", "webkit" if IS_CI else "firefox").lower()
 HEADLESS = os.getenv("HEADLESS", "true").lower() in {"1", "true", "yes", "on"}
+# Connect to an already-running `playwright run-server` instead of launching (skips cold start)
+BROWSER_WS_ENDPOINT = os.getenv("BROWSER_WS_ENDPOINT", "")
+# Persistent profile dir: HTTP cache/cookies survive between runs (opt-in; empty = fresh context)
+BROWSER_PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR", "")
 
 # Bluesky creds (required)
 BSKY_HANDLE = os.getenv("BSKY_HANDLE")
 BSKY_APP_PASSWORD = os.getenv("BSKY_APP_PASSWORD")
 if not BSKY_HANDLE or not BSKY_APP_PASSWORD:
-    builtins.print("ERROR: BSKY_HANDLE or BSKY_APP_PASSWORD missing in env/.env")
+    log.error("ERROR: BSKY_HANDLE or BSKY_APP_PASSWORD missing in env/.env")
     sys.exit(1)
 
 # Posting toggles
 POST_STATUS_UPDATES = os.getenv("POST_STATUS_UPDATES", "false").lower() in {"1","true","yes","on"}
 ALWAYS_POST_WHEN_INCONCLUSIVE = os.getenv("ALWAYS_POST_WHEN_INCONCLUSIVE", "false").lower() in {"1","true","yes","on"}
+DEBUG_ARTIFACTS = os.getenv("DEBUG_ARTIFACTS", "false").lower() in {"1","true","yes","on"}
+# Query the search API directly first; the browser then only runs to screenshot an alert
+API_FIRST = os.getenv("API_FIRST", "true").lower() in {"1","true","yes","on"}
+# Screenshots need images; without them routine polls can abort images and post text-only
+CAPTURE_SCREENSHOT = os.getenv("CAPTURE_SCREENSHOT", "true").lower() in {"1","true","yes","on"}
+# --daemon cadence; each poll opens a fresh context on the shared browser
+POLL_INTERVAL_SECONDS = int(os.getenv("POLL_INTERVAL_SECONDS", "300"))
+# HAR is the CI fallback when the response hook misses the payload; locally the hook suffices
+RECORD_HAR = os.getenv("RECORD_HAR", "true" if IS_CI else "false").lower() in {"1","true","yes","on"}
 
 # --- X (Twitter) creds FIRST ---------------------------------------------------
 TW_CONSUMER_KEY = os.getenv("TW_CONSUMER_KEY")
@@ -86,76 +151,192 @@ else:
 
 MAX_X_POSTS_PER_MONTH = int(os.getenv("MAX_X_POSTS_PER_MONTH", "450"))
 MIN_SECONDS_BETWEEN_X_POSTS = int(os.getenv("MIN_SECONDS_BETWEEN_X_POSTS", "1800"))
+# Repeat OOS/inconclusive status posts no more often than this (state changes always post)
+MIN_SECONDS_BETWEEN_STATUS_POSTS = int(os.getenv("MIN_SECONDS_BETWEEN_STATUS_POSTS", "21600"))
 
 URL = "https://www.costco.com/precious-metals.html"
+# Lucidworks search query behind the page (see json_test.py)
+API_URL = (
+    "https://search.costco.com/api/apps/www_costco_com/query/www_costco_com_navigation"
+    "?expoption=lucidworks&q=*%3A*&locale=en-US&start=0&expand=false&userLocation=CA"
+    "&loc=653-bd%2C848-bd%2C423-wh%2C1251-3pl%2C1321-wm%2C1461-3pl%2C283-wm%2C561-wm%2C725-wm"
+    "%2C731-wm%2C758-wm%2C759-wm%2C847_0-cor%2C847_0-cwt%2C847_0-edi%2C847_0-ehs%2C847_0-membership"
+    "%2C847_0-mpt%2C847_0-spc%2C847_0-wm%2C847_1-cwt%2C847_1-edi%2C847_aa_00-spc%2C847_aa_u610-edi"
+    "%2C847_d-fis%2C847_lg_n1f-edi%2C847_lux_us51-edi%2C847_NA-cor%2C847_NA-pharmacy%2C847_NA-wm"
+    "%2C847_ss_u357-edi%2C847_wp_r460-edi%2C951-wm%2C952-wm%2C9847-wcs"
+    "&whloc=423-wh&rows=24&url=%2Fprecious-metals.html"
+    "&fq=%7B!tag%3Ditem_program_eligibility%7Ditem_program_eligibility%3A(%22ShipIt%22)"
+    "&chdcategory=true&chdheader=true"
+)
 API_JSON_PATH = "api-sample.json"
 HAR_PATH = "run.har"
-SCREENSHOT = "costco.png"
+# Only record requests that can carry the search payload (skips images/JS/CSS/fonts)
+HAR_URL_FILTER = re.compile(r"search\.costco\.com|/api/|\.json")
+# Shared new_context() / launch_persistent_context() settings
+CONTEXT_OPTS = dict(
+    viewport={"width": 1920, "height": 1080},
+    ignore_https_errors=True,
+    locale="en-US",
+    timezone_id="America/Los_Angeles",
+)
+# new_context() kwargs; "minimal" drops timings/cookies/etc. but keeps the bodies the miner reads
+HAR_OPTS = dict(
+    record_har_path=HAR_PATH,
+    record_har_omit_content=False,
+    record_har_url_filter=HAR_URL_FILTER,
+    record_har_mode="minimal",
+) if RECORD_HAR else {}
+SCREENSHOT = "costco.jpg"
+# Viewport-sized JPEG: far cheaper to encode/upload than a full-page PNG; Bluesky accepts JPEG blobs.
+# Animations frozen and caret hidden so a single capture is stable (no size-based retakes).
+SCREENSHOT_OPTS = {"type": "jpeg", "quality": 80, "animations": "disabled", "caret": "hide"}
 STATE_PATH = Path(".x_post_state.json")
+# Local Bluesky budgets (below the server's 30 createSession / 5 min); kind -> (max events, window s).
+# Kept in STATE_PATH, so they span runs only where that file does (disk locally, the state cache on CI)
+BSKY_RATE_LIMITS = {"logins": (25, 300), "posts": (100, 3600)}
+# Exported atproto session (access/refresh JWTs); reused so runs don't burn createSession quota
+BSKY_SESSION_PATH = Path(os.getenv("BSKY_SESSION_PATH", ".bsky_session"))
 TIMEOUT = 90_000  # ms
 
+# Timestamp zones (resolved once; tzdata lookups are not free)
+_ZONES = (ZoneInfo("Pacific/Honolulu"), ZoneInfo("America/Los_Angeles"), ZoneInfo("America/New_York"))
+_TS_FMT = "%I:%M %p %Z"
+
 OOS_PATTERNS = [
     "we were not able to find a match",
     "no results found",
     "did not match any products",
 ]
 IN_STOCK_TERMS = ["gold bar", "gold bars", "silver bar", "silver bars", "precious metals"]
+BLOCKED_PATTERNS = ["access denied", "request was blocked", "reference #", "problem loading page"]
+
+# Page-text signals: one alternation (longest first) classifies every pattern in a single pass
+_SIGNAL_KIND = {
+    **{p: "oos" for p in OOS_PATTERNS},
+    **{p: "terms" for p in IN_STOCK_TERMS},
+    **{p: "blocked" for p in BLOCKED_PATTERNS},
+}
+# Case-insensitive, so page text is scanned as-is (no lowered copies); only the hits get lowered
+_SIGNAL_RE = re.compile("|".join(re.escape(p) for p in sorted(_SIGNAL_KIND, key=len, reverse=True)), re.I)
 
 # Status normalization sets
-_OK_STATUSES = {"in stock", "available", "available online"}
-_BAD_STATUSES = {"out of stock", "sold out", "oos", "not available"}
-_SOFT_NO_STATUSES = {"backordered", "preorder", "pre order", "coming soon", "out of stock online"}
+_OK_STATUSES = frozenset({"in stock", "available", "available online"})
+_BAD_STATUSES = frozenset({"out of stock", "sold out", "oos", "not available"})
+_SOFT_NO_STATUSES = frozenset({"backordered", "preorder", "pre order", "coming soon", "out of stock online"})
+_NOT_IN_STOCK_STATUSES = _BAD_STATUSES | _SOFT_NO_STATUSES  # one lookup in _is_in_stock
+# Doc fields consulted for a status string, in priority order
+_STATUS_KEYS = ("deliveryStatus", "item_location_stockStatus", "item_location_availability", "availability", "stockStatus")
+
+# Product tiles: new ProductTile_* structure first, legacy selectors as fallback.
+# One comma-union query; the browser dedupes elements matched by several parts.
+TILE_SELECTOR = "[data-testid^='ProductTile_'], [data-automation='product-tile'], .product-tile"
+# Screenshot crop target: grid container first in document order, so .first picks it over a tile
+GRID_SELECTOR = "[data-automation='product-grid'], .product-grid, [data-automation='product-tile']"
+# Request filter: detection needs the document, scripts, XHRs and CSS (innerText and the
+# DOM classifiers depend on what CSS hides); images stay only for the screenshot
+BLOCKED_RESOURCE_TYPES = frozenset({"font", "media"} | (set() if CAPTURE_SCREENSHOT else {"image"}))
+BLOCKED_HOST_SUFFIXES = (
+    "doubleclick.net", "googletagmanager.com", "google-analytics.com", "googlesyndication.com",
+    "adobedtm.com", "demdex.net", "omtrdc.net", "criteo.com", "criteo.net",
+    "quantummetric.com", "facebook.net", "bat.bing.com", "pinterest.com",
+    "bazaarvoice.com", "go-mpulse.net", "akstat.io",
+)
+
+# Results rendered (tiles) or explicitly empty: the readiness signal instead of networkidle
+PAGE_READY_SELECTOR = f"[data-automation='product-grid'], {TILE_SELECTOR}, .no-results"
+# Heuristic tile-count probes (max across them; grid anchors over-count, so they are not unioned)
+TILE_COUNT_PROBES = [
+    '[data-testid^="ProductTile_"]',
+    '[data-automation="product-tile"]',
+    '.product-tile',
+    '[data-automation="product-grid"] a',
+]
 
 # ------------------------------------------------------------------------------
 # Debug env print
 # ------------------------------------------------------------------------------
-builtins.print(
-    f"[env] CI={IS_CI} BROWSER={USE_BROWSER} HEADLESS={HEADLESS} "
-    f"POST_STATUS_UPDATES={POST_STATUS_UPDATES} "
-    f"ALWAYS_POST_WHEN_INCONCLUSIVE={ALWAYS_POST_WHEN_INCONCLUSIVE} "
-    f"POST_TO_X={POST_TO_X} MAX_X_POSTS_PER_MONTH={MAX_X_POSTS_PER_MONTH} "
-    f"MIN_SECONDS_BETWEEN_X_POSTS={MIN_SECONDS_BETWEEN_X_POSTS}"
+log.info(
+    "[env] CI=%s BROWSER=%s HEADLESS=%s BROWSER_WS_ENDPOINT=%s API_FIRST=%s "
+    "CAPTURE_SCREENSHOT=%s POST_STATUS_UPDATES=%s "
+    "ALWAYS_POST_WHEN_INCONCLUSIVE=%s "
+    "POST_TO_X=%s MAX_X_POSTS_PER_MONTH=%s "
+    "MIN_SECONDS_BETWEEN_X_POSTS=%s "
+    "MIN_SECONDS_BETWEEN_STATUS_POSTS=%s",
+    IS_CI, USE_BROWSER, HEADLESS, BROWSER_WS_ENDPOINT or "-", API_FIRST, CAPTURE_SCREENSHOT, POST_STATUS_UPDATES, ALWAYS_POST_WHEN_INCONCLUSIVE,
+    POST_TO_X, MAX_X_POSTS_PER_MONTH, MIN_SECONDS_BETWEEN_X_POSTS, MIN_SECONDS_BETWEEN_STATUS_POSTS,
 )
 
 # ------------------------------------------------------------------------------
 # Bluesky facets (hashtags + links)
 # ------------------------------------------------------------------------------
-HASHTAG_RE = re.compile(r'(?<!\w)#([A-Za-z0-9_]+)')
-URL_RE = re.compile(r'https?://[^\s\)\]\}>,]+')
+# Byte pattern: run against the UTF-8 encoded post so match offsets are
+# already the byte offsets Bluesky facets expect. Hashtags and links share
+# one alternation, so the post is scanned once.
+FACET_RE = re.compile(
+    rb'(?P<tag>(?<!\w)#(?P<tag_name>[A-Za-z0-9_]+))'
+    rb'|(?P<url>https?://[^\s\)\]\}>,]+)'
+)
+
+
+@functools.cache
+def _atproto():
+    """Import atproto on first use; it is heavy and only needed when posting."""
+    import atproto
+    return atproto
+
+
+def _byte_slice(start: int, end: int):
+    models = _atproto().models
+    return models.AppBskyRichtextFacet.ByteSlice(byte_start=start, byte_end=end)
 
 
-def _byte_slice(text: str, start: int, end: int) -> models.AppBskyRichtextFacet.ByteSlice:
-    bs = len(text[:start].encode("utf-8"))
-    be = bs + len(text[start:end].encode("utf-8"))
-    return models.AppBskyRichtextFacet.ByteSlice(byte_start=bs, byte_end=be)
+def _facet_spans(data: bytes, base: int = 0) -> list[tuple[str, str, int, int]]:
+    """(kind, value, byte_start, byte_end) for each tag/link in UTF-8 data, offset by base."""
+    return [
+        (m.lastgroup, m.group("tag_name" if m.lastgroup == "tag" else "url").decode("utf-8"),
+         base + m.start(), base + m.end())
+        for m in FACET_RE.finditer(data)
+    ]
+
+
+@functools.cache
+def _tail_spans() -> tuple[bytes, list]:
+    """The shared post tail (URL + hashtags) as bytes, with its facet spans relative to itself."""
+    tail = _POST_TAIL.encode("utf-8")
+    return tail, _facet_spans(tail)
 
 
 def build_facets(text: str):
+    models = _atproto().models
+    data = text.encode("utf-8")
+    tail, tail_spans = _tail_spans()
+    # Every template ends with _POST_TAIL after a newline: scan only the variable head,
+    # then splice in the precomputed tail spans shifted by the head's byte length
+    if data.endswith(tail) and data[:-len(tail)].endswith(b"\n"):
+        head = len(data) - len(tail)
+        spans = _facet_spans(data[:head]) + [(k, v, head + bs, head + be) for k, v, bs, be in tail_spans]
+    else:
+        spans = _facet_spans(data)
+
     facets = []
-    for m in HASHTAG_RE.finditer(text):
-        facets.append(
-            models.AppBskyRichtextFacet.Main(
-                features=[models.AppBskyRichtextFacet.Tag(tag=m.group(1))],
-                index=_byte_slice(text, m.start(), m.end()),
-            )
-        )
-    for m in URL_RE.finditer(text):
-        facets.append(
-            models.AppBskyRichtextFacet.Main(
-                features=[models.AppBskyRichtextFacet.Link(uri=m.group(0))],
-                index=_byte_slice(text, m.start(), m.end()),
-            )
-        )
+    for kind, value, bs, be in spans:
+        if kind == "tag":
+            feature = models.AppBskyRichtextFacet.Tag(tag=value)
+        else:
+            feature = models.AppBskyRichtextFacet.Link(uri=value)
+        facets.append(models.AppBskyRichtextFacet.Main(features=[feature], index=_byte_slice(bs, be)))
     return facets
 
 # ------------------------------------------------------------------------------
 # JSON parsing (metal counts + in-stock)
 # ------------------------------------------------------------------------------
 def _detect_metal(doc: dict) -> str:
-    forms = " ".join(doc.get("Precious_Metal_Form_attr") or []).lower()
-    purity = " ".join(doc.get("Purity_attr") or []).lower()
-    name   = (doc.get("item_product_name") or doc.get("name") or "").lower()
-    hay = " ".join([forms, purity, name])
+    # One join + one lower over all fields
+    hay = " ".join((
+        *(doc.get("Precious_Metal_Form_attr") or ()),
+        *(doc.get("Purity_attr") or ()),
+        doc.get("item_product_name") or doc.get("name") or "",
+    )).lower()
     if "gold" in hay: return "gold"
     if "silver" in hay: return "silver"
     return "other"
@@ -170,16 +351,19 @@ def _norm(s: str) -> str:
 
 def _doc_status(doc: dict) -> str:
     # Prefer deliveryStatus if present
-    for k in ("deliveryStatus", "item_location_stockStatus", "item_location_availability", "availability", "stockStatus"):
-        if k in doc and isinstance(doc.get(k), str):
-            return _norm(doc.get(k))
+    for k in _STATUS_KEYS:
+        v = doc.get(k)
+        if isinstance(v, str):
+            return _norm(v)
     return ""
 
-def _is_in_stock(doc: dict) -> bool:
-    st = _doc_status(doc)
+def _is_in_stock(doc: dict, st: str | None = None) -> bool:
+    # st: precomputed _doc_status(doc), so callers that also report it normalize once
+    if st is None:
+        st = _doc_status(doc)
     if st in _OK_STATUSES:
         return True
-    if st in _BAD_STATUSES or st in _SOFT_NO_STATUSES:
+    if st in _NOT_IN_STOCK_STATUSES:
         return False
     if "isItemInStock" in doc:
         try:
@@ -188,37 +372,41 @@ def _is_in_stock(doc: dict) -> bool:
             return False
     return False
 
-def parse_api_json(path: str) -> dict | None:
-    if not os.path.exists(path):
-        return None
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def parse_api_json(source: str | dict) -> dict | None:
+    """Summarize a search payload given either its parsed dict or a path to it."""
+    if isinstance(source, dict):
+        data = source
+    else:
+        try:
+            with open(source, "rb") as f:
+                data = _json_loads(f.read())
+        except FileNotFoundError:
+            return None
 
     resp = data.get("response", {})
     docs = resp.get("docs", [])
     num_found = int(resp.get("numFound") or len(docs))
 
+    # Flat per-metal tallies in the hot loop; nested stock dict is built once at the end
     counts = {"gold": 0, "silver": 0, "other": 0}
-    stock = {
-        "gold": {"in_stock": 0, "out_of_stock": 0},
-        "silver": {"in_stock": 0, "out_of_stock": 0},
-        "other": {"in_stock": 0, "out_of_stock": 0},
-    }
+    in_stock = {"gold": 0, "silver": 0, "other": 0}
     instock_items = []
+    detect_metal, doc_status, is_in_stock, add_item = _detect_metal, _doc_status, _is_in_stock, instock_items.append
 
     for d in docs:
-        m = _detect_metal(d)
-        counts[m] = counts.get(m, 0) + 1
-        if _is_in_stock(d):
-            stock[m]["in_stock"] += 1
-            instock_items.append({
+        m = detect_metal(d)
+        counts[m] += 1
+        st = doc_status(d)
+        if is_in_stock(d, st):
+            in_stock[m] += 1
+            add_item({
                 "id": str(d.get("item_number") or d.get("id") or ""),
                 "name": d.get("item_product_name") or d.get("name") or "",
                 "metal": m,
-                "status": _doc_status(d) or ("true" if bool(d.get("isItemInStock")) else ""),
+                "status": st or ("true" if bool(d.get("isItemInStock")) else ""),
             })
-        else:
-            stock[m]["out_of_stock"] += 1
+
+    stock = {m: {"in_stock": in_stock[m], "out_of_stock": counts[m] - in_stock[m]} for m in counts}
 
     return {
         "numFound": num_found,
@@ -231,61 +419,65 @@ def parse_api_json(path: str) -> dict | None:
 # ------------------------------------------------------------------------------
 # HAR miner (CI-reliable)
 # ------------------------------------------------------------------------------
-def extract_api_from_har(har_path: str, out_path: str) -> bool:
+def _iter_har_entries(f):
+    """Yield HAR entries from a binary file; streamed with ijson when available."""
+    if ijson is not None:
+        # One entry materialized at a time; image/JS bodies never pile up in memory
+        yield from ijson.items(f, "log.entries.item")
+    else:
+        yield from _json_loads(f.read()).get("log", {}).get("entries", [])
+
+def extract_api_from_har(har_path: str, out_path: str | None = None) -> dict | None:
     """
-    Scan HAR for a Costco/Lucidworks JSON payload with response.docs; write to out_path.
-    Returns True if found.
+    Scan HAR for a Costco/Lucidworks JSON payload with response.docs.
+    Returns the parsed payload (None if not found); also writes it to out_path when given.
     """
     try:
-        if not os.path.exists(har_path):
-            return False
-        with open(har_path, "r", encoding="utf-8") as f:
-            har = json.load(f)
-
-        entries = har.get("log", {}).get("entries", [])
         best = None
+        try:
+            f = open(har_path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            for e in _iter_har_entries(f):
+                # Cheapest test first: "costco.com" also covers search./www. hosts
+                if "costco.com" not in e.get("request", {}).get("url", ""):
+                    continue
+                res = e.get("response", {})
+                if not any(
+                    "application/json" in h.get("value", "")
+                    for h in res.get("headers", [])
+                    if h.get("name", "").lower() == "content-type"
+                ):
+                    continue
 
-        for e in entries:
-            res = e.get("response", {})
-            req = e.get("request", {})
-            url = req.get("url", "")
-            # content-type header
-            cth = ""
-            for h in res.get("headers", []):
-                if h.get("name", "").lower() == "content-type":
-                    cth = h.get("value", "")
-                    break
-
-            if "application/json" not in cth:
-                continue
-            if not any(host in url for host in ("search.costco.com", "www.costco.com", "costco.com")):
-                continue
-
-            text = res.get("content", {}).get("text", "")
-            if not text:
-                continue
-            try:
-                data = json.loads(text)
-            except Exception:
-                continue
+                text = res.get("content", {}).get("text", "")
+                if not text:
+                    continue
+                try:
+                    data = _json_loads(text)
+                except Exception:
+                    continue
 
-            if isinstance(data, dict) and "response" in data and isinstance(data["response"], dict) and "docs" in data["response"]:
-                docs = data["response"].get("docs") or []
-                score = len(docs)
-                if not best or score > best[0]:
-                    best = (score, data)
+                if isinstance(data, dict) and "response" in data and isinstance(data["response"], dict) and "docs" in data["response"]:
+                    docs = data["response"].get("docs") or []
+                    score = len(docs)
+                    if not best or score > best[0]:
+                        best = (score, text, data)
 
         if best:
-            _, data = best
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-            builtins.print(f"[har] JSON extracted from HAR → {out_path}")
-            return True
+            _, text, data = best
+            if out_path:
+                # Write the recorded body verbatim (no pretty-print round-trip)
+                with open(out_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+            log.info("[har] JSON extracted from HAR%s", f" → {out_path}" if out_path else "")
+            return data
 
-        return False
+        return None
     except Exception as e:
-        builtins.print(f"[har] parse error: {e}")
-        return False
+        log.warning("[har] parse error: %s", e)
+        return None
 
 # ------------------------------------------------------------------------------
 # DOM scrape fallback
@@ -296,17 +488,14 @@ def scrape_dom_summary(page) -> dict | None:
         # Wait/scroll cycles to allow tiles to render
         for _ in range(6):
             try:
-                page.wait_for_selector(
-                    "[data-automation='product-tile'], .product-tile, [data-testid^='ProductTile_']",
-                    timeout=2500,
-                )
+                page.wait_for_selector(TILE_SELECTOR, timeout=2500)
                 break
             except Exception:
+                # Scroll to trigger lazy-loading; the next wait_for_selector is the readiness wait
                 try:
                     page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
                 except Exception:
                     pass
-                page.wait_for_timeout(800)
         else:
             return None
 
@@ -317,23 +506,16 @@ def scrape_dom_summary(page) -> dict | None:
             return "other"
 
         # Helper: in-stock if buyable action exists on tile
-        def _tile_in_stock(tile_locator) -> bool:
-            try:
-                # Positive signals (buyable)
-                if tile_locator.locator('button:has-text("Add to Cart")').count() > 0:
-                    return True
-                if tile_locator.locator('button:has-text("Select Options")').count() > 0:
-                    return True
-                # Negative signals (not directly buyable)
-                if tile_locator.locator('button:has-text("Sign In for Details")').count() > 0:
-                    return False
-                # Fallback: price visible within tile
-                txt = (tile_locator.inner_text(timeout=800) or "")
-                if "$" in txt:
-                    return True
-            except Exception:
-                pass
-            return False
+        def _tile_in_stock(tile: dict) -> bool:
+            buttons = tile.get("buttons") or []
+            # Positive signals (buyable)
+            if any("add to cart" in b or "select options" in b for b in buttons):
+                return True
+            # Negative signals (not directly buyable)
+            if any("sign in for details" in b for b in buttons):
+                return False
+            # Fallback: price visible within tile
+            return "$" in (tile.get("text") or "")
 
         counts = {"gold": 0, "silver": 0, "other": 0}
         stock = {
@@ -343,18 +525,28 @@ def scrape_dom_summary(page) -> dict | None:
         }
         instock_items = []
 
-        # Prefer the new ProductTile_* structure; fallback to legacy selectors
-        tiles_sel = "[data-testid^='ProductTile_'], [data-automation='product-tile'], .product-tile"
-        tiles = page.locator(tiles_sel)
-        n = tiles.count()
+        # One round-trip: read text, test id, name and button labels of every tile in-page
+        tiles = page.evaluate(
+            """([sel, nameSels]) => Array.from(document.querySelectorAll(sel), el => {
+                let name = "";
+                for (const s of nameSels) {
+                  const n = el.querySelector(s);
+                  name = ((n && n.innerText) || "").trim();
+                  if (name) break;
+                }
+                return {
+                  text: (el.innerText || "").trim(),
+                  testid: el.getAttribute("data-testid") || "",
+                  name,
+                  buttons: Array.from(el.querySelectorAll("button"), b => (b.innerText || "").toLowerCase()),
+                };
+            })""",
+            [TILE_SELECTOR, ['[data-testid="Link"] span', "a span", "h3, h2", "[data-automation='product-name']"]],
+        ) or []
         seen = 0
 
-        for i in range(n):
-            loc = tiles.nth(i)
-            try:
-                txt = (loc.inner_text(timeout=1200) or "").strip()
-            except Exception:
-                txt = ""
+        for tile in tiles:
+            txt = tile.get("text") or ""
             if not txt:
                 continue
 
@@ -362,43 +554,23 @@ def scrape_dom_summary(page) -> dict | None:
             counts[m] = counts.get(m, 0) + 1
             seen += 1
 
-            in_stock = _tile_in_stock(loc)
+            in_stock = _tile_in_stock(tile)
             if in_stock:
                 stock[m]["in_stock"] += 1
             else:
                 stock[m]["out_of_stock"] += 1
 
             # Extract id + name when possible (works on ProductTile_* cards)
-            try:
-                data_id = ""
-                testid = loc.get_attribute("data-testid") or ""
-                if testid.startswith("ProductTile_"):
-                    data_id = testid.replace("ProductTile_", "")
-                name = ""
-                # Try common name spots
-                for sel_try in (
-                    '[data-testid="Link"] span',
-                    "a span",
-                    "h3, h2",
-                    "[data-automation='product-name']",
-                ):
-                    try:
-                        tloc = loc.locator(sel_try).first
-                        if tloc.count() > 0:
-                            name = (tloc.inner_text(timeout=600) or "").strip()
-                            if name:
-                                break
-                    except Exception:
-                        pass
-                if in_stock and (data_id or name):
-                    instock_items.append({
-                        "id": data_id,
-                        "name": name,
-                        "metal": m,
-                        "status": "in stock",
-                    })
-            except Exception:
-                pass
+            testid = tile.get("testid") or ""
+            data_id = testid.replace("ProductTile_", "") if testid.startswith("ProductTile_") else ""
+            name = tile.get("name") or ""
+            if in_stock and (data_id or name):
+                instock_items.append({
+                    "id": data_id,
+                    "name": name,
+                    "metal": m,
+                    "status": "in stock",
+                })
 
         if seen == 0:
             return None
@@ -433,7 +605,7 @@ def prewarm_costco(page):
 
 def robust_goto(page, url: str):
     """Multiple attempts with varied wait modes + short backoff."""
-    waits = ["commit", "domcontentloaded", "load", "networkidle"]
+    waits = ["commit", "domcontentloaded", "load"]
     last_err = None
     for attempt in range(1, RETRY_NAV_ATTEMPTS + 1):
         for wait in waits:
@@ -448,6 +620,17 @@ def robust_goto(page, url: str):
             pass
     raise last_err or RuntimeError("robust_goto failed")
 
+def _route_filter(route):
+    """Abort BLOCKED_RESOURCE_TYPES and known ad/analytics hosts; everything else continues."""
+    req = route.request
+    try:
+        host = urlsplit(req.url).hostname or ""
+        if req.resource_type in BLOCKED_RESOURCE_TYPES or host.endswith(BLOCKED_HOST_SUFFIXES):
+            return route.abort()
+    except Exception:
+        pass
+    return route.continue_()
+
 def recreate_page(context):
     """Close current pages and open a fresh one (same context)."""
     try:
@@ -458,18 +641,24 @@ def recreate_page(context):
         pass
     return context.new_page()
 
+def _discard_stale_har() -> None:
+    """Remove an earlier context's run.har so any HAR on disk is this check's (it's written on close)."""
+    if RECORD_HAR:
+        try:
+            os.unlink(HAR_PATH)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.info("[har] could not remove stale %s: %s", HAR_PATH, e)
+
 def relaunch_webkit(p, headless: bool, ua: str):
-    """One-time WebKit relaunch if session is poisoned."""
+    """One-time WebKit relaunch if session is poisoned (replaces the shared browser)."""
+    global _BROWSER, _BROWSER_UA
     browser = p.webkit.launch(headless=headless, args=[])
-    context = browser.new_context(
-        viewport={"width": 1920, "height": 1080},
-        user_agent=ua,
-        ignore_https_errors=True,
-        locale="en-US",
-        timezone_id="America/Los_Angeles",
-        record_har_path="run.har",
-        record_har_omit_content=False,
-    )
+    _BROWSER, _BROWSER_UA = browser, ua
+    _discard_stale_har()
+    context = browser.new_context(user_agent=ua, **CONTEXT_OPTS, **HAR_OPTS)
+    context.route("**/*", _route_filter)
     context.set_extra_http_headers({
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
@@ -493,139 +682,216 @@ def _write_bytes_atomic(path: str, data: bytes) -> None:
         os.fsync(f.fileno())
     os.replace(tmp, p)  # atomic on POSIX
 
-def force_load_images_and_deblur(page) -> None:
-    """Force eager-load of lazy images, strip blur/skeleton styles, and wait for all images to render."""
-    try:
-        page.evaluate("""
+def _write_bytes_in_background(path: str, data: bytes) -> None:
+    """_write_bytes_atomic off the caller's thread (non-daemon, so exit waits for it)."""
+    def _run():
+        try:
+            _write_bytes_atomic(path, data)
+        except Exception as e:
+            log.warning("[warn] background write of %s failed: %s", path, e)
+    threading.Thread(target=_run, name=f"write:{path}").start()
+
+def _deblur(page) -> None:
+    """Strip blur/skeleton styles and promote lazy images to eager loads."""
+    page.evaluate("""
+    () => {
+      const killSelectors = [
+        '.skeleton', '.Skeleton', '.shimmer', '.placeholder', '[class*="skeleton"]',
+        '[class*="Shimmer"]', '[style*="filter: blur("]', '[style*="backdrop-filter"]'
+      ];
+      for (const sel of killSelectors) {
+        document.querySelectorAll(sel).forEach(el => {
+          el.style.filter = 'none';
+          el.style.backdropFilter = 'none';
+          el.style.animation = 'none';
+          el.style.opacity = '1';
+        });
+      }
+      const imgs = Array.from(document.images || []);
+      for (const img of imgs) {
+        try {
+          img.loading = 'eager';
+          img.decoding = 'sync';
+          const dsrc = img.getAttribute('data-src') || img.getAttribute('data-original') || img.getAttribute('data-lazy');
+          const dsrcset = img.getAttribute('data-srcset');
+          if (dsrcset && !img.srcset) img.srcset = dsrcset;
+          if (dsrc && img.src !== dsrc) img.src = dsrc;
+          img.style.filter = 'none';
+          img.style.opacity = '1';
+        } catch(e) {}
+      }
+      const nudge = () => {
+        window.scrollBy(0, Math.max(200, innerHeight * 0.8));
+        window.scrollBy(0, -Math.max(150, innerHeight * 0.6));
+      };
+      for (let i=0;i<4;i++) nudge();
+    }
+    """)
+
+def _progressive_scroll(page) -> None:
+    """Scroll down the page in steps so intersection-observer loaders fire."""
+    page.evaluate("""
+        () => new Promise(resolve => {
+          let y = 0, steps = 0;
+          const step = () => {
+            window.scrollTo(0, y);
+            y += Math.max(300, innerHeight * 0.9);
+            steps++;
+            if (y >= document.body.scrollHeight || steps > 20) return resolve();
+            setTimeout(step, 120);
+          };
+          step();
+        })
+    """)
+
+def _wait_images_decoded(page, timeout: int = 7000) -> None:
+    """Wait until every <img> has loaded with real pixels (raises on timeout)."""
+    page.wait_for_function("""
         () => {
-          const killSelectors = [
-            '.skeleton', '.Skeleton', '.shimmer', '.placeholder', '[class*="skeleton"]',
-            '[class*="Shimmer"]', '[style*="filter: blur("]', '[style*="backdrop-filter"]'
-          ];
-          for (const sel of killSelectors) {
-            document.querySelectorAll(sel).forEach(el => {
-              el.style.filter = 'none';
-              el.style.backdropFilter = 'none';
-              el.style.animation = 'none';
-              el.style.opacity = '1';
-            });
-          }
           const imgs = Array.from(document.images || []);
-          for (const img of imgs) {
-            try {
-              img.loading = 'eager';
-              img.decoding = 'sync';
-              const dsrc = img.getAttribute('data-src') || img.getAttribute('data-original') || img.getAttribute('data-lazy');
-              const dsrcset = img.getAttribute('data-srcset');
-              if (dsrcset && !img.srcset) img.srcset = dsrcset;
-              if (dsrc && img.src !== dsrc) img.src = dsrc;
-              img.style.filter = 'none';
-              img.style.opacity = '1';
-            } catch(e) {}
-          }
-          const nudge = () => {
-            window.scrollBy(0, Math.max(200, innerHeight * 0.8));
-            window.scrollBy(0, -Math.max(150, innerHeight * 0.6));
-          };
-          for (let i=0;i<4;i++) nudge();
+          return imgs.length === 0 || imgs.every(i => i.complete && i.naturalWidth > 0);
         }
-        """)
-        page.evaluate("""
-            () => new Promise(resolve => {
-              let y = 0, steps = 0;
-              const step = () => {
-                window.scrollTo(0, y);
-                y += Math.max(300, innerHeight * 0.9);
-                steps++;
-                if (y >= document.body.scrollHeight || steps > 20) return resolve();
-                setTimeout(step, 120);
-              };
-              step();
-            })
-        """)
+    """, timeout=timeout)
+
+def force_load_images_and_deblur(page) -> None:
+    """Force eager-load of lazy images, strip blur/skeleton styles, and wait for all images to render."""
+    try:
+        _deblur(page)
+        _progressive_scroll(page)
         page.wait_for_timeout(800)
-        page.wait_for_function("""
-            () => {
-              const imgs = Array.from(document.images || []);
-              return imgs.length === 0 || imgs.every(i => i.complete && i.naturalWidth > 0);
-            }
-        """, timeout=7000)
-        try:
-            page.wait_for_load_state("networkidle", timeout=3000)
-        except Exception:
-            pass
+        _wait_images_decoded(page)
         page.evaluate("window.scrollTo(0, 0)")
         page.wait_for_timeout(250)
     except Exception as e:
-        builtins.print(f"[warn] force_load_images_and_deblur failed: {e}")
+        log.warning("[warn] force_load_images_and_deblur failed: %s", e)
 
 
-def take_best_screenshot(page, path: str, *, min_bytes: int = 200_000) -> None:
-    """Try to capture the product grid area first; fallback to full page, with retries (atomic overwrite)."""
+def take_best_screenshot(page, path: str | None, *, viewport_only: bool = False) -> bytes | None:
+    """
+    Capture the product grid once images are ready, else the viewport; one shot.
+    path (optional) also gets an atomic-overwrite copy of the bytes.
+    viewport_only skips the image-loading prep and grid crop (cheap evidence for status posts).
+    Returns the image bytes (None if nothing could be captured) so posting needn't re-read the file.
+    """
     try:
-        try:
-            page.wait_for_selector(
-                "[data-automation='product-grid'], [data-automation='product-tile'], .product-tile",
-                timeout=10_000
-            )
-        except Exception:
-            pass
-
-        force_load_images_and_deblur(page)
-
-        # 1) Try a tight grid crop first
-        grid_bytes = None
-        for sel in ("[data-automation='product-grid']", ".product-grid", "[data-automation='product-tile']"):
+        shot = None
+        if not viewport_only:
             try:
-                if page.locator(sel).count() > 0:
-                    grid = page.locator(sel).first
-                    grid_bytes = grid.screenshot(path=None)  # return bytes
-                    break
+                page.wait_for_selector(f"{GRID_SELECTOR}, .product-tile", timeout=10_000)
             except Exception:
                 pass
 
-        wrote = False
-        if grid_bytes:
-            _write_bytes_atomic(path, grid_bytes)
-            wrote = True
-            try:
-                if os.path.getsize(path) < min_bytes:
-                    wrote = False  # force full-page retry if too tiny
-            except Exception:
-                pass
+            # Readiness gate: returns once every image has decoded (or its timeout passes)
+            force_load_images_and_deblur(page)
 
-        # 2) If grid failed or tiny, take full-page
-        if not wrote:
-            full_bytes = page.screenshot(path=None, full_page=True)
-            _write_bytes_atomic(path, full_bytes)
-            # Retry once if still tiny (late lazy-loaders)
-            try:
-                if os.path.getsize(path) < min_bytes:
-                    page.wait_for_timeout(1500)
-                    full_bytes = page.screenshot(path=None, full_page=True)
-                    _write_bytes_atomic(path, full_bytes)
-            except Exception:
-                pass
+            # 1) Tight grid crop if the grid is present (one union query, no per-selector count()),
+            #    else the <main> region; not unioned, since <main> precedes the grid in document order
+            for sel in (GRID_SELECTOR, "main"):
+                target = page.locator(sel).first
+                try:
+                    if target.count() > 0:
+                        shot = target.screenshot(path=None, **SCREENSHOT_OPTS)  # return bytes
+                        break
+                except Exception:
+                    pass
 
+        # 2) Otherwise (or for viewport_only) the viewport (top of page is enough evidence)
+        if not shot:
+            shot = page.screenshot(path=None, **SCREENSHOT_OPTS)
     except Exception as e:
-        builtins.print(f"[warn] take_best_screenshot failed: {e}")
+        log.warning("[warn] take_best_screenshot failed: %s", e)
         try:
-            # Last-ditch: simple full-page write
-            full_bytes = page.screenshot(path=None, full_page=True)
-            _write_bytes_atomic(path, full_bytes)
+            # Last-ditch: simple viewport shot
+            shot = page.screenshot(path=None, **SCREENSHOT_OPTS)
         except Exception:
-            pass
+            return None
+
+    # File copy is only for the artifact upload; the bytes are what gets posted
+    if path:
+        try:
+            _write_bytes_atomic(path, shot)
+        except Exception as e:
+            log.warning("[warn] screenshot write failed: %s", e)
+    return shot
+
+
+def _capture_artifacts(page, *, screenshot: bool, viewport_only: bool = False) -> bytes | None:
+    """
+    Screenshot for the post (when asked) and, with DEBUG_ARTIFACTS, an HTML dump.
+    viewport_only: plain viewport shot, for posts where the page is evidence, not the subject.
+    Returns the screenshot bytes to attach, or None.
+    """
+    if page.is_closed():
+        return None
+    image = None
+    if screenshot:
+        try:
+            # This run's bytes, never a stale costco.jpg; the file is written only for debugging
+            # With images blocked there is nothing to wait for: skip the image prep and grid crop
+            image = take_best_screenshot(
+                page, SCREENSHOT if DEBUG_ARTIFACTS else None,
+                viewport_only=viewport_only or not CAPTURE_SCREENSHOT,
+            )
+            if image and DEBUG_ARTIFACTS:
+                log.info("Screenshot saved: %s", os.path.abspath(SCREENSHOT))
+        except Exception as e:
+            log.warning("[warn] screenshot failed: %s", e)
+    if DEBUG_ARTIFACTS:
+        try:
+            # <main> is what the tile selectors inspect; whole document only if there is none
+            html = page.evaluate(
+                "() => document.querySelector('main')?.outerHTML ?? document.documentElement.outerHTML"
+            )
+            with open("page.html", "w", encoding="utf-8") as f:
+                f.write(html)
+            log.debug("[debug] HTML dumped to page.html")
+        except Exception as e:
+            log.warning("[warn] html dump failed: %s", e)
+    return image
 
 
 # ------------------------------------------------------------------------------
 # Text builder + posting
 # ------------------------------------------------------------------------------
+# Post templates: static text is built once; only the dynamic fields are substituted
+_POST_TAIL = URL + "\n\n#Costco #Gold #Silver #CostcoPM"
+
+TMPL_SUMMARY = (
+    "{status_line}\n\n"
+    "🕓 {ts}\n"
+    "Items listed: {total}  |  In stock: {in_total} (Gold {g_in}, Silver {s_in})\n"
+    "Listed mix → Gold: {gold} | Silver: {silver}\n"
+    + _POST_TAIL
+)
+# Fallback (no summary) posts: status -> (headline, optional detail line)
+_TEMPLATES = {
+    "in_stock": ("🚨 Costco Precious Metals IN STOCK!", ""),
+    "oos": ("Costco Precious Metals — status update", "No items currently in stock."),
+    "inconclusive": (
+        "Costco Precious Metals — status update (signal inconclusive)",
+        "Unable to verify stock status from page payload. Monitoring continues.",
+    ),
+}
+_STATUS_TMPL = {
+    status: f"{title}\n\n🕓 {{ts}}\n" + (f"{line}\n" if line else "") + _POST_TAIL
+    for status, (title, line) in _TEMPLATES.items()
+}
+
+
+def _tri_timestamp(now: datetime | None = None) -> str:
+    """Time (default: now) as 'HST / PT / ET' for post headers."""
+    # One aware UTC reading; each astimezone is then a pure offset shift
+    now = now or datetime.now(timezone.utc)
+    return " / ".join(now.astimezone(z).strftime(_TS_FMT) for z in _ZONES)
+
+
+def _compose(status: str) -> str:
+    """Post text for a status key of _TEMPLATES, stamped now."""
+    return _STATUS_TMPL[status].format(ts=_tri_timestamp())
+
+
 def build_text_from_summary(summary: dict) -> str:
-    now = datetime.now()
-    hst = now.astimezone(ZoneInfo("Pacific/Honolulu"))
-    pt  = now.astimezone(ZoneInfo("America/Los_Angeles"))
-    et  = now.astimezone(ZoneInfo("America/New_York"))
-    ts  = f"{hst.strftime('%I:%M %p %Z')} / {pt.strftime('%I:%M %p %Z')} / {et.strftime('%I:%M %p %Z')}"
+    ts = _tri_timestamp()
 
     gold = summary["counts"].get("gold", 0)
     silver = summary["counts"].get("silver", 0)
@@ -634,52 +900,175 @@ def build_text_from_summary(summary: dict) -> str:
     s_in = summary["stock"]["silver"]["in_stock"]
     in_total = summary.get("numInStockTotal", g_in + s_in + summary["stock"]["other"]["in_stock"])
 
-    status_line = "🚨 Costco Precious Metals IN STOCK!" if in_total > 0 else "Costco Precious Metals — status update"
+    status_line = _TEMPLATES["in_stock" if in_total > 0 else "oos"][0]
 
-    text = (
-        f"{status_line}\n\n"
-        f"🕓 {ts}\n"
-        f"Items listed: {total}  |  In stock: {in_total} (Gold {g_in}, Silver {s_in})\n"
-        f"Listed mix → Gold: {gold} | Silver: {silver}\n"
-        "https://www.costco.com/precious-metals.html\n\n"
-        "#Costco #Gold #Silver #CostcoPM"
+    return TMPL_SUMMARY.format(
+        status_line=status_line, ts=ts, total=total, in_total=in_total,
+        g_in=g_in, s_in=s_in, gold=gold, silver=silver,
     )
-    return text
 
 
-def post_to_bluesky(image_path: str | None, text: str) -> None:
+_BSKY_CLIENT = None
+_BSKY_LOCK = threading.Lock()
+
+def _save_bsky_session(client) -> None:
+    """Persist the client's session string (owner-only permissions)."""
     try:
-        client = Client()
-        client.login(BSKY_HANDLE, BSKY_APP_PASSWORD)
-
-        embed = None
-        if image_path and os.path.exists(image_path):
-            with open(image_path, "rb") as f:
-                upload = client.upload_blob(f.read())
-            embed = models.AppBskyEmbedImages.Main(
-                images=[models.AppBskyEmbedImages.Image(
-                    image=upload.blob,
-                    alt="Costco precious metals page showing gold/silver bars in stock",
-                )]
-            )
+        fd = os.open(BSKY_SESSION_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(client.export_session_string())
+        os.chmod(BSKY_SESSION_PATH, 0o600)
+    except Exception as e:
+        log.warning("[bsky] could not save session: %s", e)
+
+def _bsky_rate_take(kind: str, *, record: bool = True) -> bool:
+    """
+    Take one token from the per-handle sliding-window bucket for kind ('logins'/'posts').
+    False (nothing recorded) when the window is full; timestamps live in the state file,
+    so without it (a fresh checkout) the budget only counts this process's events.
+    record=False only checks for room; call _bsky_rate_record(kind) once the event happened.
+    """
+    limit, window = BSKY_RATE_LIMITS[kind]
+    now = int(time.time())
+    s = _load_state()
+    buckets = s.setdefault("bsky_rate", {}).setdefault(BSKY_HANDLE, {})
+    recent = [t for t in buckets.get(kind, []) if now - t < window]
+    if len(recent) >= limit:
+        return False
+    if record:
+        buckets[kind] = recent + [now]
+        _save_state(s)
+    return True
+
+def _bsky_rate_record(kind: str) -> None:
+    """Record one event for kind (after the fact; see _bsky_rate_take(record=False))."""
+    _, window = BSKY_RATE_LIMITS[kind]
+    now = int(time.time())
+    s = _load_state()
+    buckets = s.setdefault("bsky_rate", {}).setdefault(BSKY_HANDLE, {})
+    buckets[kind] = [t for t in buckets.get(kind, []) if now - t < window] + [now]
+    _save_state(s)
+
+def _new_bsky_client():
+    """Client whose token refreshes are written back to BSKY_SESSION_PATH as they happen."""
+    client = _atproto().Client()
+    client.on_session_change(lambda _event, _session: _save_bsky_session(client))
+    return client
+
+def _session_is_ours(client) -> bool:
+    """True if the resumed session is BSKY_HANDLE's (by handle or DID); a leftover file may not be."""
+    me = getattr(client, "me", None)
+    want = BSKY_HANDLE.strip().lstrip("@").lower()
+    return me is not None and want in {str(getattr(me, "handle", "")).lower(), str(getattr(me, "did", "")).lower()}
 
+def _get_bsky_client(*, fresh: bool = False):
+    """
+    Logged-in Bluesky client, created once per process (createSession is rate limited).
+    Resumes the saved session when possible; falls back to handle/password login.
+    """
+    global _BSKY_CLIENT
+    with _BSKY_LOCK:
+        if fresh:
+            _BSKY_CLIENT = None
+        if _BSKY_CLIENT is None:
+            client = _new_bsky_client()
+            resumed = False
+            if not fresh:
+                try:
+                    client.login(session_string=BSKY_SESSION_PATH.read_text(encoding="utf-8").strip())
+                    resumed = _session_is_ours(client)
+                    if not resumed:
+                        log.info("[bsky] saved session belongs to another account; logging in")
+                        client = _new_bsky_client()
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    log.info("[bsky] saved session unusable, logging in: %s", e)
+                    client = _new_bsky_client()
+            if not resumed:
+                if not _bsky_rate_take("logins"):
+                    raise RuntimeError("[ratelimit] login budget exhausted; skipping createSession")
+                client.login(BSKY_HANDLE, BSKY_APP_PASSWORD)
+            _save_bsky_session(client)
+            _BSKY_CLIENT = client
+        return _BSKY_CLIENT
+
+def _is_bsky_auth_error(e: Exception) -> bool:
+    """401, or the 400 'ExpiredToken'/'InvalidToken' XRPC errors a stale session returns."""
+    resp = getattr(e, "response", None)
+    status = getattr(resp, "status_code", None)
+    if status == 401:
+        return True
+    error = getattr(getattr(resp, "content", None), "error", None)
+    return status == 400 and error in {"ExpiredToken", "InvalidToken"}
+
+def post_to_bluesky(image: bytes | None, text: str) -> bool:
+    """Post to Bluesky; True only if the post was actually sent."""
+    # Check for room now, record only a sent post: failed attempts must not eat the budget
+    if not _bsky_rate_take("posts", record=False):
+        log.warning("[ratelimit] skipping Bluesky post: %s posts in %ss", *BSKY_RATE_LIMITS["posts"])
+        return False
+    try:
         facets = build_facets(text)
-        client.send_post(text=text, embed=embed, facets=facets or None)
-        builtins.print("Bluesky post sent!")
+
+        models = _atproto().models
+
+        def _send(client):
+            embed = None
+            if image:
+                upload = client.upload_blob(image)
+                embed = models.AppBskyEmbedImages.Main(
+                    images=[models.AppBskyEmbedImages.Image(
+                        image=upload.blob,
+                        alt="Costco precious metals page showing gold/silver bars in stock",
+                    )]
+                )
+            client.send_post(text=text, embed=embed, facets=facets or None)
+
+        try:
+            _send(_get_bsky_client())
+        except Exception as e:
+            if not _is_bsky_auth_error(e):
+                raise
+            # Session went stale: log in again and retry once
+            _send(_get_bsky_client(fresh=True))
+        _bsky_rate_record("posts")
+        log.info("Bluesky post sent!")
+        return True
     except Exception as e:
-        builtins.print(f"Bluesky post failed: {e}", file=sys.stderr)
+        log.error("Bluesky post failed: %s", e)
+        return False
 
-# ----- X (Twitter) posting with gating ----------------------------------------
+# ----- Persistent state --------------------------------------------------------
 def _load_state():
-    if STATE_PATH.exists():
-        try: return json.load(open(STATE_PATH, "r", encoding="utf-8"))
-        except Exception: return {}
-    return {}
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}  # missing or unreadable: start fresh
 
 def _save_state(s):
     try: json.dump(s, open(STATE_PATH, "w", encoding="utf-8"), indent=2)
     except Exception: pass
 
+# ----- Status-update coalescing (shares the state file) -----------------------
+def _can_post_status_now(status: str) -> tuple[bool, str]:
+    """Gate repeat status updates: post on state change, else at most every MIN_SECONDS_BETWEEN_STATUS_POSTS."""
+    s = _load_state()
+    last_status = s.get("last_status")
+    last_ts = int(s.get("last_status_ts", 0))
+    now = int(time.time())
+    if status == last_status and last_ts and (now - last_ts) < MIN_SECONDS_BETWEEN_STATUS_POSTS:
+        return (False, f"'{status}' unchanged for {now - last_ts}s < {MIN_SECONDS_BETWEEN_STATUS_POSTS}s")
+    return (True, "ok")
+
+def _record_status_post(status: str):
+    s = _load_state()
+    s["last_status"] = status
+    s["last_status_ts"] = int(time.time())
+    _save_state(s)
+
+# ----- X (Twitter) posting with gating ----------------------------------------
 def _instock_set_from_summary(summary: dict) -> set:
     """Best-effort set of in-stock item identifiers; falls back to counts signature."""
     try:
@@ -734,8 +1123,8 @@ def _record_x_post(summary: dict):
     s["last_instock_ids"] = list(_instock_set_from_summary(summary))
     _save_state(s)
 
-def post_to_x(image_path: str | None, text: str) -> None:
-    """Post to X (Twitter) using OAuth 1.0a user context (Tweepy)."""
+def post_to_x(image: bytes | None, text: str) -> bool:
+    """Post to X (Twitter) using OAuth 1.0a user context (Tweepy); True only if sent."""
     missing = [k for k,v in {
         "TW_CONSUMER_KEY": TW_CONSUMER_KEY,
         "TW_CONSUMER_SECRET": TW_CONSUMER_SECRET,
@@ -743,9 +1132,11 @@ def post_to_x(image_path: str | None, text: str) -> None:
         "TW_ACCESS_TOKEN_SECRET": TW_ACCESS_TOKEN_SECRET,
     }.items() if not v]
     if missing:
-        builtins.print(f"[x] Skipping X post; missing creds: {', '.join(missing)}")
-        return
+        log.info("[x] Skipping X post; missing creds: %s", ', '.join(missing))
+        return False
     try:
+        import tweepy  # deferred: only needed when an X post actually goes out
+
         auth = tweepy.OAuth1UserHandler(
             TW_CONSUMER_KEY, TW_CONSUMER_SECRET, TW_ACCESS_TOKEN, TW_ACCESS_TOKEN_SECRET
         )
@@ -758,102 +1149,201 @@ def post_to_x(image_path: str | None, text: str) -> None:
         )
 
         media_ids = None
-        if image_path and os.path.exists(image_path):
+        if image:
             try:
-                media = api_v1.media_upload(filename=image_path)
+                # filename only names the upload (and its type); the bytes come from memory
+                media = api_v1.media_upload(filename=SCREENSHOT, file=io.BytesIO(image))
                 media_ids = [media.media_id_string]
             except Exception as e:
-                builtins.print(f"[x] media_upload failed: {e}")
+                log.warning("[x] media_upload failed: %s", e)
 
         if media_ids:
             client_v2.create_tweet(text=text, media_ids=media_ids)
         else:
             client_v2.create_tweet(text=text)
-        builtins.print("[x] X post sent!")
+        log.info("[x] X post sent!")
+        return True
     except Exception as e:
-        builtins.print(f"[x] X post failed: {e}", file=sys.stderr)
+        log.error("[x] X post failed: %s", e)
+        return False
 
-def post_everywhere(image_path: str | None, text: str, *, summary_for_x: dict | None = None) -> None:
-    # Always Bluesky
-    post_to_bluesky(image_path, text)
+def post_everywhere(image: bytes | None, text: str, *, summary_for_x: dict | None = None) -> bool:
+    """Bluesky always, X when gated in; returns whether the Bluesky post went out."""
+    posted = post_to_bluesky(image, text)
     # X is gated
     if summary_for_x is None:
-        return
+        return posted
     ok, reason = _can_post_to_x_now(summary_for_x)
     if not ok:
-        builtins.print(f"[x] Skip X post: {reason}")
-        return
-    post_to_x(image_path, text)
-    _record_x_post(summary_for_x)
+        log.info("[x] Skip X post: %s", reason)
+        return posted
+    # A failed tweet must not start the X cooldown or count against the monthly cap
+    if post_to_x(image, text):
+        _record_x_post(summary_for_x)
+    return posted
 
 # ------------------------------------------------------------------------------
 # Browser launcher (records HAR)
 # ------------------------------------------------------------------------------
-def launch_browser(p):
+# Search payload captured by the response hook for the current check
+_API_CAPTURE: dict = {"data": None}
+
+# One Playwright driver + browser per process; every check gets a fresh context.
+_PLAYWRIGHT = None
+_BROWSER = None
+_BROWSER_UA = ""
+
+_UA_CHROME = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+_UA_FIREFOX = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:129.0) Gecko/20100101 Firefox/129.0"
+_UA_SAFARI = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+              "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/605.1.15")
+
+# Background services a one-shot poll never uses (images stay on: alerts carry a screenshot).
+# Chromium-only: they apply on CI just when BROWSER=chromium|chrome is chosen. The workflow runs
+# WebKit, which has no equivalent switches, so there this list is inert.
+_CHROMIUM_CI_ARGS = [
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    "--metrics-recording-only",
+    "--mute-audio",
+]
+
+def _engine(p):
+    """(browser_type, launch kwargs, user_agent) for USE_BROWSER."""
+    args = []
+    if USE_BROWSER in ("chromium", "chrome"):
+        if IS_CI:
+            args += ["--no-sandbox", "--disable-dev-shm-usage", *_CHROMIUM_CI_ARGS]
+        kw = {"headless": HEADLESS, "args": args}
+        if USE_BROWSER == "chrome":
+            kw["channel"] = "chrome"
+        return p.chromium, kw, _UA_CHROME
+    if USE_BROWSER == "firefox":
+        if IS_CI:
+            args += ["--no-sandbox", "--disable-dev-shm-usage"]
+        return p.firefox, {"headless": HEADLESS, "args": args}, _UA_FIREFOX
+    return p.webkit, {"headless": HEADLESS, "args": []}, _UA_SAFARI
+
+def _launch(p):
+    """Launch (or connect to) USE_BROWSER and return (browser, user_agent)."""
+    if BROWSER_WS_ENDPOINT:
+        # Long-lived server: closing contexts/disconnecting leaves it running for the next poll
+        bt = p.chromium if USE_BROWSER in ("chromium", "chrome") else getattr(p, USE_BROWSER, p.webkit)
+        browser = bt.connect(BROWSER_WS_ENDPOINT)
+        ua = {"chromium": _UA_CHROME, "firefox": _UA_FIREFOX}.get(bt.name, _UA_SAFARI)
+        return browser, ua
+    bt, kw, ua = _engine(p)
+    return bt.launch(**kw), ua
+
+def _get_playwright():
+    """The process-wide Playwright driver, started on first use."""
+    global _PLAYWRIGHT
+    if _PLAYWRIGHT is None:
+        _PLAYWRIGHT = sync_playwright().start()
+        atexit.register(_shutdown_browser)
+    return _PLAYWRIGHT
+
+def _get_browser():
+    """Memoized (playwright, browser, user_agent); relaunches only if the browser went away."""
+    global _BROWSER, _BROWSER_UA
+    if _BROWSER is not None and _BROWSER.is_connected():
+        return _PLAYWRIGHT, _BROWSER, _BROWSER_UA
+    _BROWSER, _BROWSER_UA = _launch(_get_playwright())
+    return _PLAYWRIGHT, _BROWSER, _BROWSER_UA
+
+def _shutdown_browser():
+    """Close the shared browser and stop the driver (registered with atexit)."""
+    global _PLAYWRIGHT, _BROWSER
+    try:
+        if _BROWSER is not None:
+            _BROWSER.close()
+    except Exception:
+        pass
     try:
-        args = []
-        if USE_BROWSER in ("chromium", "chrome"):
-            if IS_CI:
-                args += ["--no-sandbox", "--disable-dev-shm-usage"]
-            browser = (
-                p.chromium.launch(channel="chrome", headless=HEADLESS, args=args)
-                if USE_BROWSER == "chrome"
-                else p.chromium.launch(headless=HEADLESS, args=args)
+        if _PLAYWRIGHT is not None:
+            _PLAYWRIGHT.stop()
+    except Exception:
+        pass
+    _BROWSER = _PLAYWRIGHT = None
+
+def _wait_for_capture(page, timeout_ms: int) -> bool:
+    """Wait until _on_response has captured a payload (or timeout); True if captured.
+
+    The sync API only dispatches events while a Playwright call is running, so
+    this pumps short wait_for_timeout slices instead of blocking on a threading.Event.
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    try:
+        while _API_CAPTURE["data"] is None and time.monotonic() < deadline:
+            page.wait_for_timeout(100)
+    except Exception:
+        pass
+    return _API_CAPTURE["data"] is not None
+
+def launch_browser():
+    try:
+        # --daemon reuses the working dir: a previous poll's HAR must never pass for this one's
+        _discard_stale_har()
+        if BROWSER_PROFILE_DIR:
+            # Persistent profile: the context *is* the browser; closing it ends the browser process
+            bt, kw, ua = _engine(_get_playwright())
+            context = bt.launch_persistent_context(
+                BROWSER_PROFILE_DIR, **kw, user_agent=ua, **CONTEXT_OPTS, **HAR_OPTS,
             )
-            ua = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                  "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
-        elif USE_BROWSER == "firefox":
-            if IS_CI:
-                args += ["--no-sandbox", "--disable-dev-shm-usage"]
-            browser = p.firefox.launch(headless=HEADLESS, args=args)
-            ua = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:129.0) Gecko/20100101 Firefox/129.0"
+            browser = context.browser  # None for persistent contexts
+            # No request filter here: Playwright disables the HTTP cache whenever routing is on,
+            # and the cache is what the profile is for
         else:
-            browser = p.webkit.launch(headless=HEADLESS, args=[])
-            ua = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                  "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/605.1.15")
-
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent=ua,
-            ignore_https_errors=True,
-            locale="en-US",
-            timezone_id="America/Los_Angeles",
-            # HAR recording for CI
-            record_har_path=HAR_PATH,
-            record_har_omit_content=False,
-        )
-        page = context.new_page()
+            _, browser, ua = _get_browser()
+            # HAR recording: CI by default, see RECORD_HAR
+            context = browser.new_context(user_agent=ua, **CONTEXT_OPTS, **HAR_OPTS)
+            context.route("**/*", _route_filter)
+        page = context.pages[0] if context.pages else context.new_page()
 
         # Console handlers
         def _console(msg):
             try:
-                builtins.print(f"[console][{msg.type()}] {msg.text()}")
+                log.info("[console][%s] %s", msg.type(), msg.text())
             except Exception as e:
-                builtins.print(f"[console][error] {e!r}")
+                log.info("[console][error] %r", e)
 
         def _pageerror(err):
             try:
-                builtins.print(f"[pageerror] {err}")
+                log.info("[pageerror] %s", err)
             except Exception as e:
-                builtins.print(f"[pageerror][error] {e!r}")
+                log.info("[pageerror][error] %r", e)
 
         page.on("console", _console)
         page.on("pageerror", _pageerror)
 
-        # Response hook (fast path)
+        # Response hook (fast path); stops looking once one payload is captured
+        _API_CAPTURE["data"] = None
+
         def _on_response(res):
+            if _API_CAPTURE["data"] is not None:
+                return
             try:
-                ct = (res.headers or {}).get("content-type", "")
                 url = res.url
+                # "costco.com" also covers search.costco.com
+                if "costco.com" not in url:
+                    return
+                ct = (res.headers or {}).get("content-type", "")
                 if "application/json" not in ct:
                     return
-                if not any(host in url for host in ("search.costco.com", "costco.com")):
+                body = res.body()
+                # Cheap byte sniff before paying for a full parse
+                if b'"docs"' not in body or b'"response"' not in body:
                     return
-                data = res.json()
+                data = _json_loads(body)
                 if isinstance(data, dict) and "response" in data and "docs" in data["response"]:
-                    with open(API_JSON_PATH, "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=2)
-                    builtins.print(f"[api] JSON captured from {url[:160]}... -> {API_JSON_PATH}")
+                    _API_CAPTURE["data"] = data
+                    log.info("[api] JSON captured from %s...", url[:160])
+                    if DEBUG_ARTIFACTS:
+                        # Persist the wire bytes as-is (no re-serialize), without stalling event dispatch
+                        _write_bytes_in_background(API_JSON_PATH, body)
             except Exception:
                 pass
 
@@ -863,298 +1353,422 @@ def launch_browser(p):
     except Exception as e:
         raise RuntimeError(f"Failed to launch {USE_BROWSER} (HEADLESS={HEADLESS}, CI={IS_CI}): {e}") from e
 
+# ------------------------------------------------------------------------------
+# Direct search API (fast path; same Lucidworks payload the page fetches)
+# ------------------------------------------------------------------------------
+# One pooled session per process: TLS/TCP setup is paid once, not per request
+_HTTP = requests.Session()
+_HTTP.headers.update({
+    "User-Agent": _UA_CHROME,
+    "Accept": "application/json",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": URL,
+})
+
+def api_check_stock() -> dict | None:
+    """GET the search API directly; the parsed payload, or None on HTTP error / unexpected schema."""
+    try:
+        r = _HTTP.get(API_URL, timeout=(5, 15))
+        if r.status_code != 200:
+            log.info("[api] direct query HTTP %s", r.status_code)
+            return None
+        data = _json_loads(r.content)
+        if isinstance(data, dict) and isinstance(data.get("response"), dict) and "docs" in data["response"]:
+            log.info("[api] JSON fetched directly (numFound=%s)", data["response"].get("numFound"))
+            if DEBUG_ARTIFACTS:
+                _write_bytes_atomic(API_JSON_PATH, r.content)
+            return data
+        log.info("[api] direct query returned an unexpected schema")
+    except Exception as e:
+        log.info("[api] direct query failed: %s", e)
+    return None
+
 # ------------------------------------------------------------------------------
 # Main flow
 # ------------------------------------------------------------------------------
-def check_stock():
-    with sync_playwright() as p:
-        builtins.print("Launching browser...")
-        res = launch_browser(p)
-        if not isinstance(res, tuple) or len(res) != 3:
-            raise RuntimeError("launch_browser() did not return (browser, context, page).")
-        browser, context, page = res
+def _log_summary(label: str, summary: dict, unit: str) -> None:
+    log.info(
+        "[%s] Parsed %s %s → gold=%s (in %s), silver=%s (in %s)",
+        label, summary["numFound"], unit,
+        summary["counts"]["gold"], summary["stock"]["gold"]["in_stock"],
+        summary["counts"]["silver"], summary["stock"]["silver"]["in_stock"],
+    )
 
-        builtins.print("Loading Costco...")
-        resp, last_err = None, None
+def _decide_from_summary(summary: dict, source: str = "") -> tuple | None:
+    """(text, summary_for_x, status) for a parsed summary, or None when nothing should go out."""
+    g_in = summary["stock"]["gold"]["in_stock"]
+    s_in = summary["stock"]["silver"]["in_stock"]
+    in_total = summary.get("numInStockTotal", g_in + s_in + summary["stock"]["other"]["in_stock"])
 
-        try:
-            if IS_CI:
-                # 0) Prewarm first (robots/home)
-                try: prewarm_costco(page)
-                except Exception: pass
+    if in_total > 0:
+        log.info("IN STOCK DETECTED!%s", source)
+        # Debug sample of items (only built when LOG_LEVEL=DEBUG)
+        if log.isEnabledFor(logging.DEBUG):
+            try:
+                sample = ", ".join((i["name"] or i["id"])[:60] for i in (summary.get("instock_items") or [])[:3])
+                if sample:
+                    log.debug("[debug] sample in-stock items: %s", sample)
+            except Exception:
+                pass
+        return (build_text_from_summary(summary), summary, "in_stock")
+
+    log.info("Out of stock%s", source)
+    if POST_STATUS_UPDATES:
+        log.info("[info] Posting OOS status update%s", source)
+        return (build_text_from_summary(summary), summary, "oos")
+    return None
+
+def _gate_status(to_post: tuple | None) -> tuple | None:
+    """Status updates (not alerts) are coalesced so a stuck state doesn't repost every run."""
+    if to_post and to_post[2] != "in_stock":
+        ok, reason = _can_post_status_now(to_post[2])
+        if not ok:
+            log.info("[info] Skip status update: %s", reason)
+            return None
+    return to_post
+
+def _open_costco():
+    """Launch a context and load URL (CI retry ladder); returns (context, page), page None on failure."""
+    res = launch_browser()
+    if not isinstance(res, tuple) or len(res) != 3:
+        raise RuntimeError("launch_browser() did not return (browser, context, page).")
+    browser, context, page = res
+
+    log.info("Loading Costco...")
+    resp, last_err = None, None
+
+    try:
+        if IS_CI:
+            # 0) Prewarm first (robots/home)
+            try: prewarm_costco(page)
+            except Exception: pass
 
-                # 1) Try direct goto with retries
+            # 1) Try direct goto with retries
+            try:
+                resp = robust_goto(page, URL)
+            except Exception as e:
+                log.info("[goto] robust_goto CI failed: %s", e)
+                resp = None
+
+            # 2) If direct goto failed, try in-site navigation (home → click link)
+            if resp is None:
                 try:
-                    resp = robust_goto(page, URL)
+                    page = recreate_page(context)
+                    prewarm_costco(page)
+                    # Load home and click through
+                    page.goto("https://www.costco.com/", wait_until="domcontentloaded", timeout=20_000)
+                    try:
+                        page.locator("a[href='/precious-metals.html']").first.click(timeout=5_000)
+                    except Exception:
+                        # Fallback: search for 'Precious Metals' link
+                        page.get_by_role("link", name=re.compile("Precious Metals", re.I)).first.click(timeout=6_000)
+                    # Wait for nav to settle a bit
+                    try: page.wait_for_load_state("domcontentloaded", timeout=10_000)
+                    except Exception: pass
+                    resp = page
                 except Exception as e:
-                    builtins.print(f"[goto] robust_goto CI failed: {e}")
+                    log.info("[goto] home→click flow failed: %s", e)
                     resp = None
 
-                # 2) If direct goto failed, try in-site navigation (home → click link)
-                if resp is None:
-                    try:
-                        page = recreate_page(context)
-                        prewarm_costco(page)
-                        # Load home and click through
-                        page.goto("https://www.costco.com/", wait_until="domcontentloaded", timeout=20_000)
-                        try:
-                            page.locator("a[href='/precious-metals.html']").first.click(timeout=5_000)
-                        except Exception:
-                            # Fallback: search for 'Precious Metals' link
-                            page.get_by_role("link", name=re.compile("Precious Metals", re.I)).first.click(timeout=6_000)
-                        # Wait for nav to settle a bit
-                        try: page.wait_for_load_state("domcontentloaded", timeout=10_000)
-                        except Exception: pass
-                        resp = page
-                    except Exception as e:
-                        builtins.print(f"[goto] home→click flow failed: {e}")
-                        resp = None
-
-                # 3) One-time full WebKit relaunch if still stuck
-                if resp is None:
-                    try:
-                        # Reuse your UA string from launch_browser()
-                        ua = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                            "AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Safari/605.1.15")
-                        try:
-                            browser.close()
-                        except Exception:
-                            pass
-                        browser, context, page = relaunch_webkit(p, HEADLESS, ua)
-                        prewarm_costco(page)
-                        resp = robust_goto(page, URL)
-                    except Exception as e:
-                        builtins.print(f"[goto] relaunch webkit failed: {e}")
-                        resp = None
-
-                # 4) Best-effort wait for JSON/XHR
-                if resp:
+            # 3) One-time full WebKit relaunch if still stuck
+            if resp is None:
+                try:
+                    # Reuse the WebKit UA string from _launch()
+                    ua = _UA_SAFARI
                     try:
-                        page.wait_for_response(
-                            lambda r: (("search.costco.com" in r.url) or ("costco.com" in r.url))
-                                    and ("application/json" in (r.headers or {}).get("content-type", "")),
-                            timeout=20_000,
-                        )
+                        (browser or context).close()
                     except Exception:
-                        builtins.print("[info] No Lucidworks JSON observed within 10–20s on CI")
+                        pass
+                    browser, context, page = relaunch_webkit(_PLAYWRIGHT, HEADLESS, ua)
+                    prewarm_costco(page)
+                    resp = robust_goto(page, URL)
+                except Exception as e:
+                    log.info("[goto] relaunch webkit failed: %s", e)
+                    resp = None
 
-            else:
-                for wait in ("load", "domcontentloaded", "networkidle"):
-                    try:
-                        resp = page.goto(URL, wait_until=wait, timeout=TIMEOUT)
-                        break
-                    except Exception as e:
-                        last_err = e
-                        builtins.print(f"[goto] {USE_BROWSER} failed ({wait}): {e}")
-        except Exception as e:
-            last_err = e
-            builtins.print(f"[goto] navigation error: {e}")
+            # 4) Best-effort wait for JSON/XHR (skip if the hook already captured it)
+            if resp and _API_CAPTURE["data"] is None:
+                try:
+                    page.wait_for_response(
+                        lambda r: (("search.costco.com" in r.url) or ("costco.com" in r.url))
+                                and ("application/json" in (r.headers or {}).get("content-type", "")),
+                        timeout=20_000,
+                    )
+                except Exception:
+                    log.info("[info] No Lucidworks JSON observed within 10–20s on CI")
 
-        if resp is None:
-            builtins.print(f"[error] Page failed to initiate. Last error: {last_err}")
-            builtins.print("Inconclusive")
-            try: browser.close()
-            except Exception: pass
-            return
+        else:
+            # Return at first response bytes; readiness is the selector wait below, not a load event
+            try:
+                resp = page.goto(URL, wait_until="commit", timeout=TIMEOUT)
+            except Exception as e:
+                last_err = e
+                log.info("[goto] %s failed (commit): %s", USE_BROWSER, e)
+    except Exception as e:
+        last_err = e
+        log.info("[goto] navigation error: %s", e)
 
-        # Cookie banner
-        try:
-            page.locator("#onetrust-accept-btn-handler, button:has-text('Accept All Cookies')").first.click(timeout=2500)
-            builtins.print("[info] Cookie banner accepted")
-        except Exception:
-            pass
+    if resp is None:
+        log.error("[error] Page failed to initiate. Last error: %s", last_err)
+        return context, None
+
+    # Wait for what is actually needed: the grid/tiles or an explicit no-results state
+    try:
+        page.wait_for_selector(PAGE_READY_SELECTOR, timeout=15_000)
+    except Exception:
+        log.info("[info] Results not rendered within 15s; continuing with fallbacks")
+
+    # Cookie banner
+    try:
+        page.locator("#onetrust-accept-btn-handler, button:has-text('Accept All Cookies')").first.click(timeout=2500)
+        log.info("[info] Cookie banner accepted")
+    except Exception:
+        pass
+
+    # --- NEW: ensure 'Show Out of Stock Items' facet is OFF ---
+    try:
+        # If the OOS facet chip is toggled on, click it to turn it off.
+        # Works whether it appears as a chip or a facet button.
+        oos_chip = page.locator('[data-testid="Button_facet_option_sf__Show Out of Stock Items"]').first
+        if oos_chip.count() > 0:
+            oos_chip.click(timeout=2500)
+            try:
+                page.wait_for_selector(PAGE_READY_SELECTOR, timeout=5000)
+            except Exception:
+                pass
+            log.info("[info] OOS facet turned OFF")
+    except Exception as e:
+        log.info("[info] OOS facet not toggled (maybe not present): %s", e)
+
+    return context, page
 
-        # --- NEW: ensure 'Show Out of Stock Items' facet is OFF ---
+def _decide_from_page(page) -> tuple[tuple | None, bool, bool]:
+    """
+    Hook payload, then DOM scrape, then text heuristics. Returns (to_post, blocked, heuristic);
+    heuristic means neither payload nor DOM gave a summary (the HAR may still, after close).
+    """
+    # Settle until the hook captures the payload: returns as soon as it lands, worst case 7.5 s
+    # (room for a late search XHR) before falling back to the DOM
+    _wait_for_capture(page, 7500)
+
+    # Parse JSON if we have it (in memory; no file round-trip)
+    summary = None
+    if _API_CAPTURE["data"] is not None:
         try:
-            # If the OOS facet chip is toggled on, click it to turn it off.
-            # Works whether it appears as a chip or a facet button.
-            oos_chip = page.locator('[data-testid="Button_facet_option_sf__Show Out of Stock Items"]').first
-            if oos_chip.count() > 0:
-                oos_chip.click(timeout=2500)
-                try:
-                    page.wait_for_load_state("networkidle", timeout=5000)
-                except Exception:
-                    pass
-                builtins.print("[info] OOS facet turned OFF")
+            summary = parse_api_json(_API_CAPTURE["data"])
+            if summary:
+                _log_summary("api-summary", summary, "products")
         except Exception as e:
-            builtins.print(f"[info] OOS facet not toggled (maybe not present): {e}")
-
+            log.warning("[warn] Failed to parse captured JSON: %s", e)
 
-        # Brief settle
+    # Heuristics / quick signals: only needed when there is no JSON summary to decide from
+    signals, tile_count = set(), 0
+    if summary is None:
+        # One round-trip: title, a preview sliced in-page, and the largest probe tile count
         try:
-            page.wait_for_timeout(2500)
+            info = page.evaluate(
+                """(sels) => ({
+                    title: document.title,
+                    preview: (document.body?.innerText || '').slice(0, 2000),
+                    tiles: Math.max(0, ...sels.map(s => document.querySelectorAll(s).length)),
+                })""",
+                TILE_COUNT_PROBES,
+            ) or {}
         except Exception:
-            pass
+            info = {}
+        haystack = f"{info.get('title') or ''} {info.get('preview') or ''}"
+        signals = {_SIGNAL_KIND[m.group(0).lower()] for m in _SIGNAL_RE.finditer(haystack)}
 
-        # Artifacts
-        if not page.is_closed():
-            try:
-                take_best_screenshot(page, SCREENSHOT)
-                builtins.print(f"Screenshot saved: {os.path.abspath(SCREENSHOT)}")
-            except Exception as e:
-                builtins.print(f"[warn] screenshot failed: {e}")
-            try:
-                with open("page.html", "w", encoding="utf-8") as f:
-                    f.write(page.content())
-                builtins.print("[debug] HTML dumped to page.html")
-            except Exception as e:
-                builtins.print(f"[warn] html dump failed: {e}")
+        if "blocked" in signals:
+            log.warning("[warn] Possibly blocked/consent wall. See artifacts.")
+            log.info("Inconclusive")
+            return None, True, False
 
-        # Let late XHRs land, then mine HAR if needed
-        try:
-            page.wait_for_load_state("networkidle", timeout=5000)
+        # Fallback: DOM tile count (for posting heuristics if needed)
+        tile_count = int(info.get("tiles") or 0)
+        log.debug("[debug] tile_count=%s", tile_count)
+
+    is_oos = "oos" in signals
+    has_terms = "terms" in signals
+
+    # ---- Decide, then capture + post only if something goes out ----
+    to_post = None  # (text, summary_for_x, status)
+    source = ""
+    if not summary:
+        # No JSON captured? Try DOM scrape before giving up.
+        summary = scrape_dom_summary(page)
+        source = " (DOM)"
+        if summary:
+            _log_summary("dom-summary", summary, "tiles")
+
+    if summary:
+        return _decide_from_summary(summary, source), False, False
+
+    # Heuristic fallback: classify, then one table decides whether it is posted
+    if tile_count > 0 or has_terms:
+        status = "in_stock"
+        log.info("IN STOCK DETECTED! (heuristic)")
+    elif is_oos:
+        status = "oos"
+        log.info("Out of stock")
+    else:
+        status = "inconclusive"
+        log.info("Inconclusive")
+    wanted = {
+        "in_stock": True,
+        "oos": POST_STATUS_UPDATES,
+        "inconclusive": POST_STATUS_UPDATES and ALWAYS_POST_WHEN_INCONCLUSIVE,
+    }[status]
+    if wanted:
+        to_post = (_compose(status), {}, status)
+
+    return to_post, False, True
+
+def _finish(context, page, to_post: tuple | None, *, image: bytes | None = None) -> None:
+    """Capture (if page; else attach image), post (if to_post) and close the context."""
+    # Screenshot only when it will be attached; HTML dump only for debugging.
+    # Alerts get the prepared grid crop; status updates only need the viewport as evidence
+    img = image
+    if page is not None:
+        img = _capture_artifacts(
+            page,
+            screenshot=to_post is not None and CAPTURE_SCREENSHOT,
+            viewport_only=to_post is not None and to_post[2] != "in_stock",
+        )
+    # Post from a worker thread while this thread tears the context down (HAR flush etc.).
+    # Playwright's sync API stays on this thread; the posters never touch it.
+    poster, result = None, {}
+    if to_post:
+        text, summary_for_x, status = to_post
+
+        def _post():
+            result["posted"] = post_everywhere(img, text, summary_for_x=summary_for_x)
+
+        poster = threading.Thread(target=_post, name="post")
+        poster.start()
+
+    if context is not None:
+        try: context.close()
         except Exception:
             pass
-        if not os.path.exists(API_JSON_PATH):
-            if extract_api_from_har(HAR_PATH, API_JSON_PATH):
-                builtins.print("[info] HAR mining succeeded")
 
-        # Parse JSON if we have it
-        summary = None
-        if os.path.exists(API_JSON_PATH):
-            try:
-                summary = parse_api_json(API_JSON_PATH)
-                if summary:
-                    builtins.print(
-                        f"[api-summary] Parsed {summary['numFound']} products → "
-                        f"gold={summary['counts']['gold']} (in {summary['stock']['gold']['in_stock']}), "
-                        f"silver={summary['counts']['silver']} (in {summary['stock']['silver']['in_stock']})"
-                    )
-            except Exception as e:
-                builtins.print(f"[warn] Failed to parse captured JSON: {e}")
+    if poster is not None:
+        poster.join()
+        # Only a post that went out starts the coalescing window; a failure retries next run
+        if result.get("posted"):
+            _record_status_post(status)
 
-        # Heuristics / quick signals
-        try:
-            body_preview = page.inner_text("body")[:2000]
-        except Exception:
-            body_preview = ""
-        low = (page.title().lower() + " " + body_preview.lower())
 
-        if any(x in low for x in ("access denied", "request was blocked", "reference #", "problem loading page")):
-            builtins.print("[warn] Possibly blocked/consent wall. See artifacts.")
-            builtins.print("Inconclusive")
-            try: browser.close()
-            except Exception: pass
-            return
+def _post_with_screenshot(to_post: tuple) -> None:
+    """Open the page only to screenshot an already-decided post; text-only if the browser fails."""
+    if not CAPTURE_SCREENSHOT:
+        _finish(None, None, to_post)  # text-only post: no browser at all
+        return
+    log.info("Launching browser for the screenshot...")
+    try:
+        context, page = _open_costco()
+    except Exception as e:
+        log.warning("[warn] Browser unavailable (%s); posting without a screenshot", e)
+        context, page = None, None
+    # page is None when navigation failed: the decided post still goes out, text-only
+    _finish(context, page, to_post)
 
-        # Fallback: DOM tile count (for posting heuristics if needed)
-        tile_count = 0
-        for sel in (
-            '[data-testid^="ProductTile_"]',
-            '[data-automation="product-tile"]',
-            '.product-tile',
-            '[data-automation="product-grid"] a',
-        ):
-            try:
-                c = page.locator(sel).count()
-                tile_count = max(tile_count, c or 0)
-            except Exception:
-                pass
-        builtins.print(f"[debug] tile_count={tile_count}")
 
-        is_oos = any(pat in low for pat in OOS_PATTERNS)
-        has_terms = any(term in low for term in IN_STOCK_TERMS)
+def _finish_via_har(context, page, to_post: tuple | None) -> None:
+    """
+    No hook or DOM summary: close the context to flush run.har (it is only written on close),
+    then prefer a payload mined from it over the heuristic decision in to_post.
+    """
+    # Gate first so a coalesced status pays for no screenshot, then shoot the heuristic post
+    # while the page is still open (the HTML dump happens either way in debug runs)
+    to_post = _gate_status(to_post)
+    img = _capture_artifacts(
+        page,
+        screenshot=to_post is not None and CAPTURE_SCREENSHOT,
+        viewport_only=to_post is not None and to_post[2] != "in_stock",
+    )
+    try: context.close()
+    except Exception:
+        pass
+
+    # launch_browser() deleted any earlier run.har, so this one is the current check's
+    mined = extract_api_from_har(HAR_PATH, API_JSON_PATH if DEBUG_ARTIFACTS else None)
+    summary = parse_api_json(mined) if mined else None
+    if not summary:
+        _finish(None, None, to_post, image=img)
+        return
+
+    log.info("[info] HAR mining succeeded")
+    _log_summary("har-summary", summary, "products")
+    har_post = _gate_status(_decide_from_summary(summary, " (HAR)"))
+    if har_post is None:
+        return
+    # The shot only fits if it was taken for the same status (grid crop vs. viewport);
+    # otherwise reopen the page for the right one
+    if img is not None and to_post is not None and to_post[2] == har_post[2]:
+        _finish(None, None, har_post, image=img)
+    else:
+        _post_with_screenshot(har_post)
+
 
-        # ---- Decide & post ----
+def check_stock():
+    """API first; the browser only runs for the alert screenshot or when the API gives nothing usable."""
+    if API_FIRST:
+        data = api_check_stock()
+        summary = parse_api_json(data) if data is not None else None
         if summary:
-            g_in = summary["stock"]["gold"]["in_stock"]
-            s_in = summary["stock"]["silver"]["in_stock"]
-            in_total = summary.get("numInStockTotal", g_in + s_in + summary["stock"]["other"]["in_stock"])
-            text = build_text_from_summary(summary)
-            img = SCREENSHOT if os.path.exists(SCREENSHOT) else None
-
-            if in_total > 0:
-                builtins.print("IN STOCK DETECTED!")
-                # Debug sample of items
-                try:
-                    sample = ", ".join((i["name"] or i["id"])[:60] for i in (summary.get("instock_items") or [])[:3])
-                    if sample:
-                        builtins.print(f"[debug] sample in-stock items: {sample}")
-                except Exception:
-                    pass
-                post_everywhere(img, text, summary_for_x=summary)
-            else:
-                builtins.print("Out of stock")
-                if POST_STATUS_UPDATES:
-                    builtins.print("[info] Posting OOS status update")
-                    post_everywhere(img, text, summary_for_x=summary)
+            _log_summary("api-summary", summary, "products")
+            to_post = _gate_status(_decide_from_summary(summary, " (API)"))
+            # Nothing to post means no browser at all
+            if to_post is not None:
+                _post_with_screenshot(to_post)
+            return
+        log.info("[api] No usable payload; falling back to the browser")
 
-        else:
-            # No JSON captured? Try DOM scrape before giving up.
-            dom_summary = scrape_dom_summary(page)
-            img = SCREENSHOT if os.path.exists(SCREENSHOT) else None
-
-            if dom_summary:
-                builtins.print(
-                    f"[dom-summary] Parsed {dom_summary['numFound']} tiles → "
-                    f"gold={dom_summary['counts']['gold']} (in {dom_summary['stock']['gold']['in_stock']}), "
-                    f"silver={dom_summary['counts']['silver']} (in {dom_summary['stock']['silver']['in_stock']})"
-                )
-                text = build_text_from_summary(dom_summary)
-                g_in = dom_summary["stock"]["gold"]["in_stock"]
-                s_in = dom_summary["stock"]["silver"]["in_stock"]
-                in_total = dom_summary.get("numInStockTotal", g_in + s_in + dom_summary["stock"]["other"]["in_stock"])
-                if in_total > 0:
-                    builtins.print("IN STOCK DETECTED! (DOM)")
-                    post_everywhere(img, text, summary_for_x=dom_summary)
-                else:
-                    builtins.print("Out of stock (DOM)")
-                    if POST_STATUS_UPDATES:
-                        builtins.print("[info] Posting OOS status update (DOM)")
-                        post_everywhere(img, text, summary_for_x=dom_summary)
-            else:
-                # Heuristic fallback
-                if tile_count > 0 or has_terms:
-                    builtins.print("IN STOCK DETECTED! (heuristic)")
-                    now = datetime.now()
-                    hst = now.astimezone(ZoneInfo("Pacific/Honolulu"))
-                    pt  = now.astimezone(ZoneInfo("America/Los_Angeles"))
-                    et  = now.astimezone(ZoneInfo("America/New_York"))
-                    ts  = f"{hst.strftime('%I:%M %p %Z')} / {pt.strftime('%I:%M %p %Z')} / {et.strftime('%I:%M %p %Z')}"
-                    text = (
-                        "🚨 Costco Precious Metals IN STOCK!\n\n"
-                        f"🕓 {ts}\n"
-                        "https://www.costco.com/precious-metals.html\n\n"
-                        "#Costco #Gold #Silver #CostcoPM"
-                    )
-                    post_everywhere(img, text, summary_for_x={})
-                elif is_oos:
-                    builtins.print("Out of stock")
-                    if POST_STATUS_UPDATES:
-                        now = datetime.now()
-                        hst = now.astimezone(ZoneInfo("Pacific/Honolulu"))
-                        pt  = now.astimezone(ZoneInfo("America/Los_Angeles"))
-                        et  = now.astimezone(ZoneInfo("America/New_York"))
-                        ts  = f"{hst.strftime('%I:%M %p %Z')} / {pt.strftime('%I:%M %p %Z')} / {et.strftime('%I:%M %p %Z')}"
-                        text = (
-                            "Costco Precious Metals — status update\n\n"
-                            f"🕓 {ts}\n"
-                            "No items currently in stock.\n"
-                            "https://www.costco.com/precious-metals.html\n\n"
-                            "#Costco #Gold #Silver #CostcoPM"
-                        )
-                        post_everywhere(img, text, summary_for_x={})
-                else:
-                    builtins.print("Inconclusive")
-                    if POST_STATUS_UPDATES and ALWAYS_POST_WHEN_INCONCLUSIVE:
-                        now = datetime.now()
-                        hst = now.astimezone(ZoneInfo("Pacific/Honolulu"))
-                        pt  = now.astimezone(ZoneInfo("America/Los_Angeles"))
-                        et  = now.astimezone(ZoneInfo("America/New_York"))
-                        ts  = f"{hst.strftime('%I:%M %p %Z')} / {pt.strftime('%I:%M %p %Z')} / {et.strftime('%I:%M %p %Z')}"
-                        text = (
-                            "Costco Precious Metals — status update (signal inconclusive)\n\n"
-                            f"🕓 {ts}\n"
-                            "Unable to verify stock status from page payload. Monitoring continues.\n"
-                            "https://www.costco.com/precious-metals.html\n\n"
-                            "#Costco #Gold #Silver #CostcoPM"
-                        )
-                        post_everywhere(img, text, summary_for_x={})
-
-        try: browser.close()
+    log.info("Launching browser...")
+    context, page = _open_costco()
+    if page is None:
+        log.info("Inconclusive")
+        _finish(context, None, None)
+        return
+
+    to_post, blocked, heuristic = _decide_from_page(page)
+    if blocked:
+        _capture_artifacts(page, screenshot=DEBUG_ARTIFACTS)
+        _finish(context, None, None)
+        return
+    if heuristic and RECORD_HAR:
+        _finish_via_har(context, page, to_post)
+        return
+    _finish(context, page, _gate_status(to_post))
+
+def _run_daemon(interval: int) -> None:
+    """Poll forever on a fixed cadence; the memoized browser stays up between polls."""
+    log.info("[daemon] Polling every %ss", interval)
+    while True:
+        started = time.monotonic()
+        try:
+            check_stock()
         except Exception:
-            pass
+            log.exception("[daemon] Poll failed")
+        sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Costco precious metals stock alert")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="run a single check and exit (default)")
+    mode.add_argument("--daemon", action="store_true", help="keep polling, reusing one browser process")
+    ap.add_argument("--interval", type=int, default=POLL_INTERVAL_SECONDS, help="seconds between --daemon polls")
+    args = ap.parse_args(argv)
+    if args.daemon:
+        if BROWSER_PROFILE_DIR:
+            # The persistent context is the browser: it is closed and relaunched on every poll
+            log.warning("[daemon] BROWSER_PROFILE_DIR relaunches the browser each poll "
+                        "(no browser reuse, no request filter); unset it for --daemon")
+        _run_daemon(args.interval)
+    else:
+        check_stock()
 
 # ------------------------------------------------------------------------------
 if __name__ == "__main__":
-    check_stock()
+    main()